@@ -2,11 +2,13 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-import datetime as dt
 
 sys.path.append(os.path.abspath(os.path.join('..')))
 from import_data import load_existing_data, save_data
 
+# eps should be multiplied by 4 when it is based on the quarterly earnings, 1 if annual.
+EPS_FACTORS = {'annual': 1.0, 'quarterly': 4.0}
+
 
 def get_basic_eps(df_financial_statements, report_type):
     """
@@ -17,20 +19,23 @@ def get_basic_eps(df_financial_statements, report_type):
     :type df_financial_statements: pd.DataFrame
     :param report_type: which type of financial report to use, 'annual' or 'quarterly' reports.
     :type report_type: str
-    :return: pandas dataframe that consists of the earning per share of each entry in df_financial_statements
-    :rtype: pd.DataFrame
+    :return: pandas series that consists of the earning per share of each entry in df_financial_statements
+    :rtype: pd.Series
     """
 
-    # eps should be multiplied by 4 when it is based on the quarterly earnings, 1 if annual.
-    if report_type == 'annual':
-        eps_factor = 1.0
-    elif report_type == 'quarterly':
-        eps_factor = 4.0
-    else:
-        eps_factor = 0.0
+    eps_factor = EPS_FACTORS.get(report_type, 0.0)
+
+    net_income = pd.to_numeric(df_financial_statements.netIncomeApplicableToCommonShares,
+                               errors='coerce').to_numpy(dtype=np.float64)
+    shares_outstanding = pd.to_numeric(df_financial_statements.commonStockSharesOutstanding,
+                                       errors='coerce').to_numpy(dtype=np.float64)
+
+    # eps is set to np.nan if there are no shares outstanding
+    eps = np.full_like(net_income, np.nan)
+    np.divide(net_income, shares_outstanding, out=eps, where=shares_outstanding != 0)
+    eps *= eps_factor
 
-    df_eps = (df_financial_statements.netIncomeApplicableToCommonShares /
-              df_financial_statements.commonStockSharesOutstanding) * eps_factor
+    df_eps = pd.Series(eps, index=df_financial_statements.index)
 
     return df_eps
 
@@ -54,76 +59,78 @@ def get_stock_prices(financial_ratios, stock_prices, stock_price_type, date_offs
     :rtype: list
     """
 
-    stock_price_list = []
+    # there is nothing to match if there are no entries or no stock prices
+    if financial_ratios.empty or stock_prices.empty:
+        return [np.nan] * financial_ratios.shape[0]
 
-    # loop through all entries in financial_ratios to find the matching stock price
-    for idx in range(financial_ratios.shape[0]):
-        symbol = financial_ratios.iloc[idx].Symbol
-        # get the stock price on the fiscal ending date in the entry or a date offset set by the user
-        date = financial_ratios.iloc[idx].fiscalDateEnding + dt.timedelta(days=date_offset)
-        stock_price = stock_prices[(stock_prices.Symbol == symbol)
-                                   & (stock_prices.Date == date)][stock_price_type].values
+    # get the stock price on the fiscal ending date in each entry or a date offset set by the user.
+    # 'order' keeps track of the original position of each entry as merge_asof requires sorted dates.
+    # both dates are converted to datetime64[ns] once, so that they are matched without python datetime objects
+    # and have the same resolution, which pd.to_datetime otherwise keeps from the input in newer pandas versions.
+    fiscal_dates = (pd.to_datetime(financial_ratios.fiscalDateEnding).to_numpy(dtype='datetime64[ns]')
+                    + np.timedelta64(date_offset, 'D'))
+    df_dates = pd.DataFrame({'Symbol': financial_ratios.Symbol.to_numpy(),
+                             'Date': fiscal_dates,
+                             'order': np.arange(financial_ratios.shape[0])}).dropna(subset=['Date']).sort_values('Date')
+    df_prices = pd.DataFrame({'Symbol': stock_prices.Symbol.to_numpy(),
+                              'Date': pd.to_datetime(stock_prices.Date).to_numpy(dtype='datetime64[ns]'),
+                              stock_price_type: stock_prices[stock_price_type].to_numpy()}
+                             ).dropna(subset=['Date']).sort_values('Date')
 
-        # if no stock price is found on this date, try one day later and keep adding one day if not found.
-        while_loop_count = 0
-        while stock_price.size == 0:
-            while_loop_count += 1
-            date += dt.timedelta(days=1)
-            stock_price = stock_prices[(stock_prices.Symbol == symbol)
-                                       & (stock_prices.Date == date)][stock_price_type].values
+    # if no stock price is found on this date, take the stock price of the next available date.
+    # if no stock price is available within 4 days after this date, the stock price is set to np.nan
+    df_matched = pd.merge_asof(df_dates, df_prices, on='Date', by='Symbol', direction='forward',
+                               tolerance=pd.Timedelta(days=4))
 
-            # if no stock price is available 5 days later, stop finding and set it to np.nan
-            if while_loop_count > 4:
-                stock_price = [np.nan]
-                break
+    # put the found stock prices back into the original order of the entries in financial_ratios
+    stock_price_list = np.full(financial_ratios.shape[0], np.nan)
+    stock_price_list[df_matched['order'].to_numpy()] = df_matched[stock_price_type].to_numpy()
 
-        # append the found stock price to the list
-        stock_price_list.append(stock_price[0])
-
-    return stock_price_list
+    return stock_price_list.tolist()
 
 
 def calc_financial_ratios(df_financial_statements, df_profile, df_stock_prices, report_type):
     """
-    This function aims to calculate the financial ratios for the selected entries (annual or quarterly) in
+    This function aims to calculate the financial ratios for the entries (annual or quarterly) in
     df_financial_statements and return a dataframe that consists of all the computed financial ratios.
 
     :param df_financial_statements: pandas dataframe with data imported from FinancialStatementsTable saved
-    in import_data.py
+    in import_data.py, only the entries of the given report_type
     :param df_profile: pandas dataframe with data imported from CompanyProfileTable saved in import_data.py
     :param df_stock_prices: pandas dataframe with data imported from StockPricesTable saved in import_data.py
     :param report_type:
     :return:
     """
 
-    # construct a base dataframe which consists of the the symbol and fiscal ending date
-    df_selected_financial_statements = df_financial_statements[df_financial_statements.type == report_type]
-    df_financial_ratios = df_selected_financial_statements[['Symbol', 'fiscalDateEnding']]
-
-    # get stock prices based on the 'Symbol' and 'fiscalDateEnding' in df_financial_ratios and append to it
+    # get stock prices based on the 'Symbol' and 'fiscalDateEnding' in df_financial_statements
     print('-> Getting stock prices...')
-    selected_stock_prices = get_stock_prices(df_financial_ratios, df_stock_prices, '5. adjusted close', 0)
-    df_financial_ratios.loc[:, 'StockPriceOnFiscalDateEnding'] = selected_stock_prices
+    stock_prices_on_fiscal_date_ending = get_stock_prices(df_financial_statements, df_stock_prices,
+                                                          '5. adjusted close', 0)
     print('-> Stock prices retrieved!')
 
     # get stock prices on the day which is 45 days later than the fiscalDateEnding
     print('-> Getting stock prices (45 days later)...')
-    selected_stock_prices = get_stock_prices(df_financial_ratios, df_stock_prices, '5. adjusted close', 45)
-    df_financial_ratios.loc[:, 'StockPrice45daysLater'] = selected_stock_prices
+    stock_prices_45_days_later = get_stock_prices(df_financial_statements, df_stock_prices, '5. adjusted close', 45)
     print('-> Stock prices retrieved!')
 
     # get stock prices on the day which is 90 days later than the fiscalDateEnding
     print('-> Getting stock prices (90 days later)...')
-    selected_stock_prices = get_stock_prices(df_financial_ratios, df_stock_prices, '5. adjusted close', 90)
-    df_financial_ratios.loc[:, 'StockPrice90daysLater'] = selected_stock_prices
+    stock_prices_90_days_later = get_stock_prices(df_financial_statements, df_stock_prices, '5. adjusted close', 90)
     print('-> Stock prices retrieved!')
 
-    # Calculate basic eps and concatenate df_eps to the final dataframe, df_financial_ratios
+    # Calculate basic eps
     print('-> Getting EPS...')
-    df_eps = get_basic_eps(df_selected_financial_statements, report_type)
-    df_financial_ratios = pd.concat([df_financial_ratios, pd.DataFrame(df_eps, columns=['EPS'])], axis=1)
+    df_eps = get_basic_eps(df_financial_statements, report_type)
     print('-> EPS calculated!')
 
+    # construct the final dataframe, df_financial_ratios, which consists of the symbol and fiscal ending date
+    # and all financial ratios at once
+    df_financial_ratios = df_financial_statements[['Symbol', 'fiscalDateEnding']].assign(
+        StockPriceOnFiscalDateEnding=stock_prices_on_fiscal_date_ending,
+        StockPrice45daysLater=stock_prices_45_days_later,
+        StockPrice90daysLater=stock_prices_90_days_later,
+        EPS=df_eps.to_numpy())
+
     return df_financial_ratios
 
 
@@ -132,12 +139,23 @@ def main():
 
         financial_data_database_filepath, financial_ratios_database_filepath, report_type = sys.argv[1:]
 
-        # load financial data from CompanyData.db
+        # load only the financial data needed to calculate the financial ratios from CompanyData.db
         print('Loading database...\n->DATABASE: {}'.format(financial_data_database_filepath))
-        financial_statements, profile, stock_prices = load_existing_data(financial_data_database_filepath)
+        financial_statements, profile, stock_prices, _ = load_existing_data(
+            financial_data_database_filepath,
+            {'FinancialStatementsTable': ['Symbol', 'type', 'fiscalDateEnding', 'netIncomeApplicableToCommonShares',
+                                          'commonStockSharesOutstanding'],
+             'StockPricesTable': ['Symbol', 'Date', '5. adjusted close']})
+
+        # select the financial statements of the given report type
+        financial_statements_by_type = financial_statements.groupby('type', sort=False)
+        if report_type in financial_statements_by_type.groups:
+            selected_financial_statements = financial_statements_by_type.get_group(report_type)
+        else:
+            selected_financial_statements = financial_statements.iloc[:0]
 
         print('Calculating financial ratios...')
-        financial_ratios = calc_financial_ratios(financial_statements, profile, stock_prices, report_type)
+        financial_ratios = calc_financial_ratios(selected_financial_statements, profile, stock_prices, report_type)
         print('Done!')
 
         print('Saving data...\n->DATABASE: {}'.format(financial_ratios_database_filepath))
@@ -3,10 +3,148 @@ import requests
 import time
 import csv
 import os
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
-import datetime as dt
-from sqlalchemy import create_engine
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, event, inspect
+try:
+    # orjson parses the large API responses considerably faster than the standard json module
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# names of the tables in the database for each data option
+TABLE_NAMES = {0: 'CompanyProfileTable', 1: 'FinancialStatementsTable', 2: 'StockPricesTable', 3: 'EarningsTable'}
+
+# date columns of the tables in the database
+DATE_COLUMNS = {'FinancialStatementsTable': ['fiscalDateEnding'],
+                'CompanyProfileTable': ['DividendDate', 'ExDividendDate', 'LastSplitDate'],
+                'StockPricesTable': ['Date'],
+                'EarningsTable': ['fiscalDateEnding', 'reportedDate']}
+
+# shared http session which keeps the connections to the APIs alive between requests
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+# number of seconds to wait for the connection to the API and for the response data
+HTTP_TIMEOUT = (5, 30)
+
+# requests that fail due to temporary server or connection errors are sent again up to HTTP_RETRIES times,
+# waiting HTTP_BACKOFF_FACTOR * 2 ** (retry - 1) seconds before each retry
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# directory of the cached API responses and the number of seconds a cached response is used (90 days)
+HTTP_CACHE_DIR = '.cache'
+HTTP_CACHE_TTL = 90 * 24 * 60 * 60
+
+# the free API key of alphavantage.co allows 5 API requests per minute, one second is added as a safety margin.
+# the send times of the last API requests are kept to wait only as long as needed before the next request.
+# once the stop event is set, no further API requests are sent to alphavantage.co, e.g. after a failed request.
+ALPHA_VANTAGE_REQUEST_LIMIT = 5
+ALPHA_VANTAGE_REQUEST_PERIOD = 61
+alpha_vantage_request_times = deque(maxlen=ALPHA_VANTAGE_REQUEST_LIMIT)
+alpha_vantage_request_lock = threading.Lock()
+alpha_vantage_stop_event = threading.Event()
+
+
+def wait_for_alpha_vantage_request():
+    """
+    This function aims to keep the API requests to alphavantage.co within the limit of the free API key. It waits
+    until less than ALPHA_VANTAGE_REQUEST_LIMIT requests were sent within the last ALPHA_VANTAGE_REQUEST_PERIOD
+    seconds and registers the send time of the next request. It is safe to be called from multiple threads.
+    A ValueError is raised instead if alpha_vantage_stop_event is set before or while waiting.
+    """
+
+    with alpha_vantage_request_lock:
+        if len(alpha_vantage_request_times) == ALPHA_VANTAGE_REQUEST_LIMIT:
+            waiting_time = ALPHA_VANTAGE_REQUEST_PERIOD - (time.monotonic() - alpha_vantage_request_times[0])
+            if (waiting_time > 0) and (not alpha_vantage_stop_event.is_set()):
+                print('Sleeping {:.0f} seconds before requesting next company data...'.format(waiting_time))
+                alpha_vantage_stop_event.wait(waiting_time)
+
+        if alpha_vantage_stop_event.is_set():
+            raise ValueError('Data collection from alphavantage.co is stopped')
+
+        alpha_vantage_request_times.append(time.monotonic())
+
+
+def get_json_response(url, required_key=None, ttl=HTTP_CACHE_TTL, rate_limited=False):
+    """
+    This function aims to request the given url and return the status code and the parsed json body of the response.
+    Complete responses are cached on disk in HTTP_CACHE_DIR, so that the same request is not sent again within ttl
+    seconds. A response is complete if it contains required_key or, if no required_key is given, if it is a
+    non-empty list. Error messages, e.g. of an exceeded API limit, are therefore never cached.
+    If rate_limited is True, the request is only sent once it is within the API limit of alphavantage.co.
+    Requests that fail due to temporary errors are retried, the last response is returned if all retries fail.
+    A ValueError is raised if the request still fails, e.g. due to a timeout or a connection error.
+
+    :param url: url of the API request
+    :type url: str
+    :param required_key: optional, key that a complete json response must contain
+    :type required_key: str
+    :param ttl: optional, number of seconds a cached response is used
+    :type ttl: int
+    :param rate_limited: optional, True if the request counts towards the API limit of alphavantage.co
+    :type rate_limited: bool
+    :return: status code of the response, 200 if the cached response is used
+    :rtype: int
+    :return: parsed json body of the response
+    :rtype: dict or list
+    """
+
+    cache_filepath = os.path.join(HTTP_CACHE_DIR, '{}.json'.format(hashlib.md5(url.encode()).hexdigest()))
+
+    # use the cached response if it is not older than ttl
+    if os.path.isfile(cache_filepath) and time.time() - os.path.getmtime(cache_filepath) < ttl:
+        with open(cache_filepath, 'rb') as cache_file:
+            return 200, json_loads(cache_file.read())
+
+    for retry in range(HTTP_RETRIES + 1):
+        if retry > 0:
+            time.sleep(HTTP_BACKOFF_FACTOR * 2 ** (retry - 1))
+
+        # only requests that are actually sent count towards the API limit, cached responses are returned right
+        # away. every retry is a request of its own and therefore waits for the API limit as well
+        if rate_limited:
+            wait_for_alpha_vantage_request()
+
+        # a request that fails even after the retries, e.g. due to a timeout, interrupts the data collection
+        # in the same way as an unsuccessful response
+        try:
+            response = SESSION.get(url, timeout=HTTP_TIMEOUT)
+        except requests.exceptions.RequestException as error:
+            if retry < HTTP_RETRIES:
+                continue
+
+            print('Request failed with {}!'.format(type(error).__name__))
+            raise ValueError('Request failed with {}'.format(type(error).__name__)) from error
+
+        if response.status_code not in HTTP_RETRY_STATUS_CODES:
+            break
+
+    payload = json_loads(response.content)
+
+    if required_key is None:
+        is_complete = isinstance(payload, list) and len(payload) > 0
+    else:
+        is_complete = required_key in payload
+
+    if (response.status_code == 200) and is_complete:
+        # write to a temporary file first, so that a cached response is never read while it is being written
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        temp_filepath = '{}.{}.tmp'.format(cache_filepath, os.getpid())
+        with open(temp_filepath, 'wb') as cache_file:
+            cache_file.write(response.content)
+        os.replace(temp_filepath, cache_filepath)
+
+    return response.status_code, payload
 
 
 def alpha_get_financial_statement(ticker, statement_type, api_key):
@@ -24,30 +162,31 @@ def alpha_get_financial_statement(ticker, statement_type, api_key):
     :rtype: pd.DataFrame
     """
 
-    financial_statement_response = requests.get("https://www.alphavantage.co/query?function={}&symbol={}&apikey={}"
-                                             .format(statement_type, ticker, api_key))
+    status_code, financial_statement = get_json_response("https://www.alphavantage.co/query?"
+                                                         "function={}&symbol={}&apikey={}"
+                                                         .format(statement_type, ticker, api_key), 'symbol',
+                                                         rate_limited=True)
 
-    if (financial_statement_response.status_code == 200) & ('symbol' in financial_statement_response.json()):
-        df_temp = pd.DataFrame({'Symbol': [], 'type': []})
-        annual_statement = financial_statement_response.json().get('annualReports')
-        df_annual_statement = pd.concat([df_temp, pd.DataFrame(annual_statement)], axis=1)
-        df_annual_statement.iloc[:, 1] = 'annual'
+    if (status_code == 200) & ('symbol' in financial_statement):
+        annual_statement = financial_statement.get('annualReports')
+        df_annual_statement = pd.DataFrame(annual_statement)
+        df_annual_statement.insert(0, 'type', 'annual')
 
-        quarterly_statement = financial_statement_response.json().get('quarterlyReports')
-        df_quarterly_statement = pd.concat([df_temp, pd.DataFrame(quarterly_statement)], axis=1)
-        df_quarterly_statement.iloc[:, 1] = 'quarterly'
+        quarterly_statement = financial_statement.get('quarterlyReports')
+        df_quarterly_statement = pd.DataFrame(quarterly_statement)
+        df_quarterly_statement.insert(0, 'type', 'quarterly')
 
         df_financial_statement = pd.concat([df_annual_statement, df_quarterly_statement], ignore_index=True)
-        df_financial_statement.iloc[:, 0] = financial_statement_response.json().get('symbol')
+        df_financial_statement.insert(0, 'Symbol', financial_statement.get('symbol'))
     else:
-        print('Status Code:{}'.format(financial_statement_response.status_code))
-        if "Information" in financial_statement_response.json():
-            print(financial_statement_response.json().get('Information'))
+        print('Status Code:{}'.format(status_code))
+        if "Information" in financial_statement:
+            print(financial_statement.get('Information'))
         else:
             print('Something is wrong with the response!')
 
         raise ValueError('Get annual {} failed with {}'
-              .format(statement_type, financial_statement_response.status_code))
+              .format(statement_type, status_code))
 
     return df_financial_statement
 
@@ -65,25 +204,26 @@ def alpha_get_company_profile_data(ticker, api_key):
     :rtype: pd.DataFrame
     """
 
-    company_profile_response = requests.get("https://www.alphavantage.co/query?function=OVERVIEW&symbol={}&apikey={}"
-                                            .format(ticker, api_key))
+    status_code, company_profile_response = get_json_response("https://www.alphavantage.co/query?"
+                                                              "function=OVERVIEW&symbol={}&apikey={}"
+                                                              .format(ticker, api_key), 'Symbol',
+                                                              rate_limited=True)
 
-    if (company_profile_response.status_code == 200) & ('Symbol' in company_profile_response.json()):
-        company_profile = [company_profile_response.json()]
+    if (status_code == 200) & ('Symbol' in company_profile_response):
+        company_profile = [company_profile_response]
     else:
-        print('Status Code:{}'.format(company_profile_response.status_code))
-        if "Information" in company_profile_response.json():
-            print(company_profile_response.json().get('Information'))
+        print('Status Code:{}'.format(status_code))
+        if "Information" in company_profile_response:
+            print(company_profile_response.get('Information'))
         else:
             print('Something is wrong with the response!')
 
         raise ValueError('Get {} company profile data failed with {}'
-                         .format(ticker, company_profile_response.status_code))
+                         .format(ticker, status_code))
 
-    if pd.DataFrame(company_profile).empty:
-        raise ValueError('No data retrieved! Check API!')
+    df_company_profile = pd.DataFrame(company_profile)
 
-    return pd.DataFrame(company_profile)
+    return df_company_profile
 
 
 def alpha_get_company_stock_prices(ticker, api_key):
@@ -99,30 +239,35 @@ def alpha_get_company_stock_prices(ticker, api_key):
     :rtype: pd.DataFrame
     """
 
-    stock_price_response = requests.get("https://www.alphavantage.co/query?"
-                                        "function=TIME_SERIES_DAILY_ADJUSTED&symbol={}&outputsize=full&apikey={}"
-                                        .format(ticker, api_key))
-
-    if (stock_price_response.status_code == 200) & ('Meta Data' in stock_price_response.json()):
-        df_temp = pd.DataFrame({'Symbol': []})
-        # get only the daily stock prices
-        stock_price = stock_price_response.json().get('Time Series (Daily)')
-        # concatenate the symbol column with the data
-        df_stock_price = pd.concat([df_temp, pd.DataFrame(stock_price, dtype=float).T], axis=1)
-        # assign stock ticker symbol to the Symbol column
-        df_stock_price.iloc[:, 0] = stock_price_response.json().get('Meta Data').get('2. Symbol')
-        # rename the index name to Date and assign it as a column
-        df_stock_price.index.names = ['Date']
-        df_stock_price.reset_index(level=0, inplace=True)
+    # stock prices change daily, so a cached response is only used for one day
+    status_code, stock_price_response = get_json_response("https://www.alphavantage.co/query?"
+                                                          "function=TIME_SERIES_DAILY_ADJUSTED&symbol={}"
+                                                          "&outputsize=full&apikey={}"
+                                                          .format(ticker, api_key), 'Meta Data',
+                                                          ttl=24 * 60 * 60, rate_limited=True)
+
+    if (status_code == 200) & ('Meta Data' in stock_price_response):
+        # get only the daily stock prices, a dictionary of the prices on each date
+        stock_price = stock_price_response.get('Time Series (Daily)')
+        # build each price column directly from the daily prices instead of transposing a dataframe with
+        # one column per date
+        price_types = list(next(iter(stock_price.values()))) if stock_price else []
+        df_stock_price = pd.DataFrame({price_type: np.fromiter((daily_prices[price_type]
+                                                                for daily_prices in stock_price.values()),
+                                                               dtype=np.float64, count=len(stock_price))
+                                       for price_type in price_types})
+        # add the dates and the stock ticker symbol as the first columns
+        df_stock_price.insert(0, 'Date', np.array(list(stock_price), dtype='datetime64[D]'))
+        df_stock_price.insert(1, 'Symbol', stock_price_response.get('Meta Data').get('2. Symbol'))
     else:
-        print('Status Code:{}'.format(stock_price_response.status_code))
-        if "Information" in stock_price_response.json():
-            print(stock_price_response.json().get('Information'))
+        print('Status Code:{}'.format(status_code))
+        if "Information" in stock_price_response:
+            print(stock_price_response.get('Information'))
         else:
             print('Something is wrong with the response!')
 
         raise ValueError('Get {} stock prices failed with {}'
-              .format(ticker, stock_price_response.status_code))
+              .format(ticker, status_code))
 
     return df_stock_price
 
@@ -140,35 +285,80 @@ def alpha_get_company_earnings(ticker, api_key):
     :rtype: pd.DataFrame
     """
 
-    earnings_response = requests.get("https://www.alphavantage.co/query?"
-                                        "function=EARNINGS&symbol={}&apikey={}"
-                                        .format(ticker, api_key))
+    status_code, earnings_response = get_json_response("https://www.alphavantage.co/query?"
+                                                       "function=EARNINGS&symbol={}&apikey={}"
+                                                       .format(ticker, api_key), 'symbol',
+                                                       rate_limited=True)
 
-    if (earnings_response.status_code == 200) & ('symbol' in earnings_response.json()):
-        df_temp = pd.DataFrame({'Symbol': [], 'type': []})
-        annual_earnings = earnings_response.json().get('annualEarnings')
-        df_annual_earnings = pd.concat([df_temp, pd.DataFrame(annual_earnings)], axis=1)
-        df_annual_earnings.iloc[:, 1] = 'annual'
+    if (status_code == 200) & ('symbol' in earnings_response):
+        annual_earnings = earnings_response.get('annualEarnings')
+        df_annual_earnings = pd.DataFrame(annual_earnings)
+        df_annual_earnings.insert(0, 'type', 'annual')
 
-        quarterly_earnings = earnings_response.json().get('quarterlyEarnings')
-        df_quarterly_earnings = pd.concat([df_temp, pd.DataFrame(quarterly_earnings)], axis=1)
-        df_quarterly_earnings.iloc[:, 1] = 'quarterly'
+        quarterly_earnings = earnings_response.get('quarterlyEarnings')
+        df_quarterly_earnings = pd.DataFrame(quarterly_earnings)
+        df_quarterly_earnings.insert(0, 'type', 'quarterly')
 
         df_earnings = pd.concat([df_annual_earnings, df_quarterly_earnings], ignore_index=True)
-        df_earnings.iloc[:, 0] = earnings_response.json().get('symbol')
+        df_earnings.insert(0, 'Symbol', earnings_response.get('symbol'))
     else:
-        print('Status Code:{}'.format(earnings_response.status_code))
-        if "Information" in earnings_response.json():
-            print(earnings_response.json().get('Information'))
+        print('Status Code:{}'.format(status_code))
+        if "Information" in earnings_response:
+            print(earnings_response.get('Information'))
         else:
             print('Something is wrong with the response!')
 
         raise ValueError('Get {} earnings failed with {}'
-              .format(ticker, earnings_response.status_code))
+              .format(ticker, status_code))
 
     return df_earnings
 
 
+def combine_financial_statements(financial_statements):
+    """
+    This function aims to combine the financial statements (income, balance sheet and cash flow statement) of a
+    company into one dataframe.
+
+    :param financial_statements: a list of the financial statements of the same company
+    :type financial_statements: list
+    :return: financial data of the company in all given financial statements
+    :rtype: pd.DataFrame
+    """
+
+    # remove the columns which are retrieved everytime a financial statement is requested, e.g. Symbol, from all but
+    # the first statement that contains them, so that duplicated columns are never concatenated
+    unique_statements = []
+    existing_columns = set()
+    for statement in financial_statements:
+        unique_statements.append(statement.loc[:, ~statement.columns.isin(existing_columns)])
+        existing_columns.update(statement.columns)
+
+    # concatenate data from all financial statements horizontally
+    financial_data = pd.concat(unique_statements, axis=1)
+
+    return financial_data
+
+
+def alpha_get_financial_data(ticker, api_key):
+    """
+    This function aims to retrieve the annual and quarterly data in the income, balance sheet and cash flow statement
+    of a selected company available in alphavantage.co and combine them into one dataframe.
+
+    :param ticker: listed company ticker
+    :type ticker: str
+    :param api_key: user's api key in alphavantage.co
+    :type api_key: str
+    :return: annual and quarterly financial data of the selected company
+    :rtype: pd.DataFrame
+    """
+
+    income_statement = alpha_get_financial_statement(ticker, 'INCOME_STATEMENT', api_key)
+    balance_sheet_statement = alpha_get_financial_statement(ticker, 'BALANCE_SHEET', api_key)
+    cash_flow_statement = alpha_get_financial_statement(ticker, 'CASH_FLOW', api_key)
+
+    return combine_financial_statements([income_statement, balance_sheet_statement, cash_flow_statement])
+
+
 def alpha_collect_companies_data(tickers_list, api_key, option):
     """
     This function aims to collect data from all companies in the tickers_list. The type of data that can be collected
@@ -179,8 +369,8 @@ def alpha_collect_companies_data(tickers_list, api_key, option):
     3 = company's annual and quarterly earnings only
     This function returns 4 different data frames that correspond to 4 different types of collected data. Only the
     dataframe with the chosen data type will be filled with data, the rest will be empty dataframes.
-    Furthermore, there is a 60 seconds delay for every 5 API requests due to the limitation of free API key from
-    alphavantage.co
+    The companies are requested concurrently and each API request waits only as long as needed to stay within the
+    limit of 5 API requests per minute of the free API key from alphavantage.co
 
     :param tickers_list: a list of tickers that should be collected
     :type tickers_list: list
@@ -199,102 +389,66 @@ def alpha_collect_companies_data(tickers_list, api_key, option):
     :rtype: pd.DataFrame
     """
 
-    companies_profile_data = pd.DataFrame()
-    companies_financial_data = pd.DataFrame()
-    companies_stock_prices = pd.DataFrame()
-    companies_earnings = pd.DataFrame()
-    api_request_count = 0
-    api_request_count_limit = 3
-    last_updated_symbols = []
+    # functions that collect the data of a single company for each option
+    collect_functions = {0: alpha_get_company_profile_data,
+                         1: alpha_get_financial_data,
+                         2: alpha_get_company_stock_prices,
+                         3: alpha_get_company_earnings}
+    data_descriptions = {0: 'profile data', 1: 'financial data', 2: 'historical stock prices', 3: 'earnings'}
+
+    companies_data = [pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()]
+    collected_frames = []
     is_interrupted = 0
 
+    # the companies are collected concurrently, the API limit is kept by each API request in get_json_response
+    alpha_vantage_stop_event.clear()
     try:
-        for ticker in tickers_list:
-            if option == 0:
-                print('        Getting {} profile data...'.format(ticker))
-                # set api_request_count_limit to 5
-                api_request_count_limit = 5
-                # get current company's profile data
-                profile_data = alpha_get_company_profile_data(ticker, api_key)
-                # increase api count
-                api_request_count += 1
-
-                # append retrieved data of the current company to the final dataframe
-                companies_profile_data = companies_profile_data.append(profile_data, ignore_index=True)
-
-                last_updated_symbols = companies_profile_data.Symbol.unique().tolist()
-
-            elif option == 1:
-                print('        Getting {} financial data...'.format(ticker))
-                # set api_request_count_limit to 3
-                api_request_count_limit = 3
-                # get current company's financial data
-                income_statement = alpha_get_financial_statement(ticker, 'INCOME_STATEMENT', api_key)
-                balance_sheet_statement = alpha_get_financial_statement(ticker, 'BALANCE_SHEET', api_key)
-                cash_flow_statement = alpha_get_financial_statement(ticker, 'CASH_FLOW', api_key)
-                # increase api count
-                api_request_count += 3
-
-                # concatenate data from all 3 financial statements horizontally
-                financial_data = pd.concat([income_statement, balance_sheet_statement, cash_flow_statement], axis=1)
-
-                # append retrieved data of the current company to the final dataframe
-                companies_financial_data = companies_financial_data.append(financial_data, ignore_index=True)
-
-                last_updated_symbols = companies_financial_data.Symbol.unique().tolist()
-
-            elif option == 2:
-                print('        Getting {} historical stock prices...'.format(ticker))
-                # set api_request_count_limit to 5
-                api_request_count_limit = 5
-                # get current company's historical stock prices
-                stock_prices = alpha_get_company_stock_prices(ticker, api_key)
-                # increase api count
-                api_request_count += 1
-
-                # append retrieved data of the current company to the final dataframe
-                companies_stock_prices = companies_stock_prices.append(stock_prices)
-
-                last_updated_symbols = companies_stock_prices.Symbol.unique().tolist()
-
-            elif option == 3:
-                print('        Getting {} earnings...'.format(ticker))
-                # set api_request_count_limit to 5
-                api_request_count_limit = 5
-                # get current company's earnings
-                earnings = alpha_get_company_earnings(ticker, api_key)
-                # increase api count
-                api_request_count += 1
-
-                # append retrieved data of the current company to the final dataframe
-                companies_earnings = companies_earnings.append(earnings, ignore_index=True)
-
-                last_updated_symbols = companies_earnings.Symbol.unique().tolist()
-
-            print('        {} data received!'.format(ticker))
-
-            if api_request_count >= api_request_count_limit:
-                print('Sleeping 60 seconds before requesting next company data...')
-                time.sleep(60)
-                # reset the api_request_count after sleeping for 60 sec
-                api_request_count = 0
-
-    except ValueError:
-        print('Data collection interrupted! Continuing rest of the process..')
-        is_interrupted = 1
+        with ThreadPoolExecutor(max_workers=ALPHA_VANTAGE_REQUEST_LIMIT) as executor:
+            futures = [executor.submit(collect_functions[option], ticker, api_key) for ticker in tickers_list]
+
+            try:
+                # the results are received in the order of tickers_list
+                for ticker, future in zip(tickers_list, futures):
+                    print('        Getting {} {}...'.format(ticker, data_descriptions[option]))
+                    data = future.result()
+
+                    # append retrieved data of the current company to the list of collected data
+                    collected_frames.append(data)
+                    print('        {} data received!'.format(ticker))
+
+            except ValueError:
+                print('Data collection interrupted! Continuing rest of the process..')
+                is_interrupted = 1
+
+            finally:
+                # stop requesting data of the remaining companies, also if the collection fails with any other error.
+                # the companies that are being collected already stop before their next API request
+                alpha_vantage_stop_event.set()
+                for future in futures:
+                    future.cancel()
+
+    finally:
+        # all companies have stopped being collected, so API requests outside of this collection are allowed again
+        alpha_vantage_stop_event.clear()
+
+    # combine the collected data of all companies into the final dataframe at once
+    if collected_frames:
+        companies_data[option] = pd.concat(collected_frames, ignore_index=True)
 
     if not is_interrupted:
-        last_updated_symbols = []
         if os.path.isfile("last_updated_symbols.csv"):
             os.remove("last_updated_symbols.csv")
     else:
+        # the symbols are only needed if the collection is interrupted
+        last_updated_symbols = []
+        if not companies_data[option].empty:
+            last_updated_symbols = companies_data[option]['Symbol'].unique().tolist()
+
         with open('last_updated_symbols.csv', 'w', newline='') as my_file:
             wr = csv.writer(my_file, quoting=csv.QUOTE_ALL)
             wr.writerow(last_updated_symbols)
 
-    companies_financial_data = companies_financial_data.loc[:, ~companies_financial_data.columns.duplicated()]
-
-    return companies_profile_data, companies_financial_data, companies_stock_prices, companies_earnings
+    return tuple(companies_data)
 
 
 def get_annual_financial_statement(ticker, statement_type, api_key):
@@ -312,14 +466,15 @@ def get_annual_financial_statement(ticker, statement_type, api_key):
     :rtype: pd.DataFrame
     """
 
-    annual_statement_response = requests.get("https://financialmodelingprep.com/api/v3/{}/{}?apikey={}"
-                                             .format(statement_type, ticker, api_key))
+    status_code, annual_statement_response = get_json_response("https://financialmodelingprep.com/api/v3/"
+                                                               "{}/{}?apikey={}"
+                                                               .format(statement_type, ticker, api_key))
 
-    if annual_statement_response.status_code == 200:
-        annual_statement = annual_statement_response.json()
+    if status_code == 200:
+        annual_statement = annual_statement_response
     else:
         print('Get annual {} failed with {}'
-              .format(statement_type, annual_statement_response.status_code))
+              .format(statement_type, status_code))
 
     return pd.DataFrame(annual_statement)
 
@@ -337,20 +492,23 @@ def get_company_profile_data(ticker, api_key):
     :rtype: pd.DataFrame
     """
 
-    company_profile_response = requests.get("https://financialmodelingprep.com/api/v3/profile/{}?apikey={}"
-                                            .format(ticker, api_key))
+    status_code, company_profile_response = get_json_response("https://financialmodelingprep.com/api/v3/"
+                                                              "profile/{}?apikey={}"
+                                                              .format(ticker, api_key))
 
-    if company_profile_response.status_code == 200:
-        company_profile = company_profile_response.json()
+    if status_code == 200:
+        company_profile = company_profile_response
     else:
         raise ValueError('Get {} company profile data failed with {}'
-                         .format(ticker, company_profile_response.status_code))
+                         .format(ticker, status_code))
 
     # if company profile is empty, there might be something wrong while retrieving data. Throw ValueError.
-    if pd.DataFrame(company_profile).empty:
+    if not company_profile:
         raise ValueError('No data retrieved! Check API!')
 
-    return pd.DataFrame(company_profile)
+    df_company_profile = pd.DataFrame(company_profile)
+
+    return df_company_profile
 
 
 def collect_companies_data(tickers_list, api_key):
@@ -369,82 +527,156 @@ def collect_companies_data(tickers_list, api_key):
     :rtype: pd.DataFrame
     """
 
-    companies_profile_data = pd.DataFrame()
-    companies_financial_data = pd.DataFrame()
+    profile_frames = []
+    financial_frames = []
 
-    try:
-        for ticker in tickers_list:
-            print('        Getting {} data...'.format(ticker))
-            # get current company's financial and profile data
-            profile_data = get_company_profile_data(ticker, api_key)
-            income_statement = get_annual_financial_statement(ticker, 'income-statement', api_key)
-            balance_sheet_statement = get_annual_financial_statement(ticker, 'balance-sheet-statement', api_key)
-            cash_flow_statement = get_annual_financial_statement(ticker, 'cash-flow-statement', api_key)
-
-            # concatenate data from all 3 financial statements horizontally
-            financial_data = pd.concat([income_statement, balance_sheet_statement, cash_flow_statement], axis=1)
-
-            # append retrieved data of the current company to the final dataframes
-            companies_financial_data = companies_financial_data.append(financial_data, ignore_index=True)
-            companies_profile_data = companies_profile_data.append(profile_data, ignore_index=True)
-            print('        {} data received!'.format(ticker))
-    except ValueError:
-        print('    Data collection interrupted! Continuing rest of the process..')
-
-    # remove duplicated columns which are retrieved everytime a financial statement is requested
-    companies_financial_data = companies_financial_data.loc[:, ~companies_financial_data.columns.duplicated()]
+    statement_types = ['income-statement', 'balance-sheet-statement', 'cash-flow-statement']
+
+    # request the profile data and the financial statements of all companies concurrently,
+    # the results are handled in the order of tickers_list
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [[executor.submit(get_company_profile_data, ticker, api_key)] +
+                   [executor.submit(get_annual_financial_statement, ticker, statement_type, api_key)
+                    for statement_type in statement_types]
+                   for ticker in tickers_list]
+
+        try:
+            for ticker, (profile_future, *statement_futures) in zip(tickers_list, futures):
+                print('        Getting {} data...'.format(ticker))
+                # get current company's financial and profile data
+                profile_data = profile_future.result()
+                financial_data = combine_financial_statements([future.result() for future in statement_futures])
+
+                # append retrieved data of the current company to the lists of collected data
+                financial_frames.append(financial_data)
+                profile_frames.append(profile_data)
+                print('        {} data received!'.format(ticker))
+        except ValueError:
+            print('    Data collection interrupted! Continuing rest of the process..')
+
+        finally:
+            # stop requesting data of the remaining companies, also if the collection fails with any other error
+            for company_futures in futures:
+                for future in company_futures:
+                    future.cancel()
+
+    # combine the collected data of all companies into the final dataframes at once
+    companies_financial_data = pd.concat(financial_frames, ignore_index=True) if financial_frames else pd.DataFrame()
+    companies_profile_data = pd.concat(profile_frames, ignore_index=True) if profile_frames else pd.DataFrame()
 
     return companies_financial_data, companies_profile_data
 
 
-def load_existing_data(database_filepath):
+@lru_cache(maxsize=None)
+def get_engine(database_filepath):
+    """
+    This function aims to create the sqlalchemy engine of the sqlite database given in database_filepath. The engine
+    is only created once per database and reused in every following call.
+
+    :param database_filepath: file path with the name of the sql database to access.
+    :type database_filepath: str
+    :return: sqlalchemy engine of the given database
+    :rtype: sqlalchemy.engine.Engine
+    """
+
+    engine = create_engine('sqlite:///{}'.format(database_filepath))
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # write-ahead logging lets sqlite write large tables without syncing the database file on every commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+    return engine
+
+
+def load_table(connection, table_name, columns=None):
+    """
+    This function aims to load the given table from the database with its date columns converted to datetime.
+
+    :param connection: connection to the database
+    :type connection: sqlalchemy.engine.Connection
+    :param table_name: name of the table to load
+    :type table_name: str
+    :param columns: optional, list of columns that should be loaded, all columns are loaded if not given
+    :type columns: list
+    :return: the loaded table
+    :rtype: pd.DataFrame
+    """
+
+    return pd.read_sql_table(table_name, connection, columns=columns, parse_dates=DATE_COLUMNS[table_name])
+
+
+def get_existing_symbols(database_filepath, table_name):
+    """
+    This function aims to return the symbols of all companies that have data in the given table of the database
+    without loading the table itself.
+
+    :param database_filepath: file path with the name of the sql database to access.
+    :type database_filepath: str
+    :param table_name: name of the table in the database
+    :type table_name: str
+    :return: symbols of the companies in the table, an empty set if the table does not exist
+    :rtype: set
+    """
+
+    engine = get_engine(database_filepath)
+
+    with engine.connect() as connection:
+        if table_name not in inspect(connection).get_table_names():
+            return set()
+
+        df_symbols = pd.read_sql('SELECT DISTINCT Symbol FROM "{}"'.format(table_name), connection)
+
+    return set(df_symbols['Symbol'].dropna().tolist())
+
+
+def load_existing_data(database_filepath, columns=None):
     """
     This functions aims to load and return the FinancialStatementTable, CompanyProfileTable, StockPricesTable
     and EarningsTable saved in the database given in database_filepath as separate dataframes. If the given database
-    or the tables do not exist, this function will return empty dataframes.
+    or the tables do not exist, this function will return empty dataframes. The columns to be loaded can be limited
+    per table with columns, all columns of a table are loaded if it is not given there.
 
     :param database_filepath: file path with the name of the sql database to access.
     :type database_filepath: str
+    :param columns: optional, table names mapped to the list of columns that should be loaded from the table
+    :type columns: dict
     :return: FinancialStatementsTable, CompanyProfileTable, StockPricesTable, EarningsTable as dataframes,
     empty dataframes if they do not exist.
     :rtype: pd.DataFrame
     """
-    df_financial_statements = pd.DataFrame()
-    df_profile = pd.DataFrame()
-    df_stock_prices = pd.DataFrame()
-    df_earnings = pd.DataFrame()
+    table_names = ['FinancialStatementsTable', 'CompanyProfileTable', 'StockPricesTable', 'EarningsTable']
+    tables = {}
 
-    try:
-        engine = create_engine('sqlite:///{}'.format(database_filepath))
-    except:
-        print('    CompanyData.db does not exist')
+    if columns is None:
+        columns = {}
 
-    try:
-        df_financial_statements = pd.read_sql_table('FinancialStatementsTable', engine)
-    except:
-        print('FinancialStatementsTable does not exist in CompanyData.db!')
+    engine = get_engine(database_filepath)
 
-    try:
-        df_profile = pd.read_sql_table('CompanyProfileTable', engine)
-    except:
-        print('CompanyProfileTable does not exist in CompanyData.db!')
+    # list the existing tables first and read all of them over a single connection
+    with engine.connect() as connection:
+        existing_table_names = set(inspect(connection).get_table_names())
 
-    try:
-        df_stock_prices = pd.read_sql_table('StockPricesTable', engine)
-    except:
-        print('StockPricesTable does not exist in CompanyData.db!')
+        for table_name in table_names:
+            if table_name in existing_table_names:
+                tables[table_name] = load_table(connection, table_name, columns.get(table_name))
+            else:
+                print('{} does not exist in CompanyData.db!'.format(table_name))
+                tables[table_name] = pd.DataFrame()
 
-    try:
-        df_earnings = pd.read_sql_table('EarningsTable', engine)
-    except:
-        print('EarningsTable does not exist in CompanyData.db!')
+    df_financial_statements, df_profile, df_stock_prices, df_earnings = [tables[name] for name in table_names]
 
     return df_financial_statements, df_profile, df_stock_prices, df_earnings
 
 
-def save_data(df, database_filename, table_name):
+def save_data(df, database_filename, table_name, if_exists='replace'):
     """
-    This function aims to save a dataset into a sqlite database with the provided name.
+    This function aims to save a dataset into a sqlite database with the provided name. The table is replaced by
+    the dataset, unless if_exists is 'append', then the rows of the dataset are added to the existing table.
 
     :param df: a dataframe that consists of disaster messages and corresponding categories
     :type df: pd.DataFrame
@@ -452,11 +684,16 @@ def save_data(df, database_filename, table_name):
     :type database_filename: str
     :param table_name: name of the SQL table
     :type table_name: str
+    :param if_exists: optional, 'replace' to replace the table or 'append' to add the rows to the existing table
+    :type if_exists: str
     :return: none
     """
 
-    engine = create_engine('sqlite:///{}'.format(database_filename))
-    df.to_sql(table_name, engine, index=False, if_exists='replace')
+    engine = get_engine(database_filename)
+
+    # replace or append to the table and insert all rows in a single transaction
+    with engine.begin() as connection:
+        df.to_sql(table_name, connection, index=False, if_exists=if_exists)
 
 
 def convert_columns_to_numeric(df, exclude_cols):
@@ -471,31 +708,10 @@ def convert_columns_to_numeric(df, exclude_cols):
     :return: None
     """
 
-    all_cols = df.columns.tolist()
-
-    for col in exclude_cols:
-        all_cols.remove(col)
-
-    for col in all_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-
-def replace_cell_string(df, old_str, new_str):
-    """
-    This function aims to replace a string in a cell of a pandas dataframe with a new string
-
-    :param df: pandas DataFrame to be processed
-    :type df: pd.DataFrame
-    :param old_str: original string in a cell that should be replaced
-    :type old_str: str
-    :param new_str: new string to be assigned to replace the old string
-    :type new_str: str
-    :return: None
-    """
+    numeric_cols = df.columns.difference(exclude_cols, sort=False)
 
-    for col in df.columns.tolist():
-        if df.dtypes[col] == 'O' and df[col].str.contains(old_str).any():
-            df.loc[df[col] == old_str, col] = new_str
+    # convert all columns at once and assign them back to df in a single step
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
 
 
 def convert_str_to_datetime(df, cols):
@@ -508,8 +724,9 @@ def convert_str_to_datetime(df, cols):
     :type cols: list
     :return: None
     """
-    for col in cols:
-        df[col] = df[col].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d') if type(x) == str else x)
+    # entries that are already datetime are kept, strings that are not a date (e.g. 'None') are set to NaT.
+    # all selected columns are converted and assigned back to the dataframe at once
+    df[cols] = df[cols].apply(pd.to_datetime, format='%Y-%m-%d', errors='coerce')
 
 
 def clean_data(df_profile, df_financial_data, df_stock_prices, df_earnings):
@@ -529,13 +746,11 @@ def clean_data(df_profile, df_financial_data, df_stock_prices, df_earnings):
     """
 
     if not df_profile.empty:
-        # remove all rows with no symbol which are added due to unhandled error in API
-        df_profile.drop(df_profile[df_profile['Symbol'].apply(lambda x: x is None)].index,
-                        inplace=True)
+        # convert string type None and [None] to np.nan in a single pass
+        df_profile.replace(['None', None], np.nan, inplace=True)
 
-        # convert string type None to [None] and then converts [None] to np.nan
-        replace_cell_string(df_profile, 'None', np.nan)
-        df_profile.replace([None], np.nan, inplace=True)
+        # remove all rows with no symbol which are added due to unhandled error in API
+        df_profile.dropna(subset=['Symbol'], inplace=True)
 
         convert_str_to_datetime(df_profile, ['DividendDate', 'ExDividendDate', 'LastSplitDate'])
     else:
@@ -546,8 +761,7 @@ def clean_data(df_profile, df_financial_data, df_stock_prices, df_earnings):
                                    ['Symbol', 'type', 'fiscalDateEnding', 'reportedCurrency'])
 
         # remove all rows with no symbol which are added due to unhandled error in API
-        df_financial_data.drop(df_financial_data[df_financial_data['Symbol'].apply(lambda x: x is None)].index,
-                               inplace=True)
+        df_financial_data.dropna(subset=['Symbol'], inplace=True)
 
         convert_str_to_datetime(df_financial_data, ['fiscalDateEnding'])
     else:
@@ -555,8 +769,7 @@ def clean_data(df_profile, df_financial_data, df_stock_prices, df_earnings):
 
     if not df_stock_prices.empty:
         # remove all rows with no symbol which are added due to unhandled error in API
-        df_stock_prices.drop(df_stock_prices[df_stock_prices['Symbol'].apply(lambda x: x is None)].index,
-                             inplace=True)
+        df_stock_prices.dropna(subset=['Symbol'], inplace=True)
 
         convert_str_to_datetime(df_stock_prices, ['Date'])
     else:
@@ -567,18 +780,19 @@ def clean_data(df_profile, df_financial_data, df_stock_prices, df_earnings):
                                    ['Symbol', 'type', 'fiscalDateEnding', 'reportedDate'])
 
         # remove all rows with no symbol which are added due to unhandled error in API
-        df_earnings.drop(df_earnings[df_earnings['Symbol'].apply(lambda x: x is None)].index,
-                         inplace=True)
+        df_earnings.dropna(subset=['Symbol'], inplace=True)
 
         convert_str_to_datetime(df_earnings, ['fiscalDateEnding', 'reportedDate'])
     else:
         print('Empty EarningsTable!')
 
 
-def update_table(companies_list, df, api_key, data_option):
+def update_table(companies_list, database_filepath, api_key, data_option):
     """
     This function aims to update the selected table. If the companies' data already exist in the table,
-    the corresponding data will not be retrieved.
+    the corresponding data will not be retrieved. Only the data of the missing companies is returned to be appended
+    to the table, unless it has columns that are not in the table yet. Then the table is loaded from the database
+    and returned together with the new data to replace the table.
     0 = CompanyProfileTable
     1 = FinancialStatementsTable
     2 = StockPricesTable
@@ -586,28 +800,37 @@ def update_table(companies_list, df, api_key, data_option):
 
     :param companies_list: list of companies whose data should be retrieved from alphavantage.co
     :type companies_list: list
-    :param df: a pandas DataFrame that represents the selected table in the database.
-    :type df: pd.DataFrame
+    :param database_filepath: path to the sqlite database
+    :type database_filepath: str
     :param api_key: user's api key in alphavantage.co
     :type api_key: str
     :param data_option: an integer which specifies which table in the database should be updated.
     :type data_option: integer
-    :return: none
+    :return: the data to be saved to the table, an empty dataframe if the table is unchanged
+    :rtype: pd.DataFrame
+    :return: how the data should be saved to the table, 'replace' or 'append', None if the table is unchanged
+    :rtype: str
     """
 
     missing_companies_list = []
+    df = pd.DataFrame()
+    save_mode = None
+
+    # only the symbols of the companies in the table are needed to find the missing companies
+    table_name = TABLE_NAMES[data_option]
+    existing_symbols = get_existing_symbols(database_filepath, table_name)
 
     # if no data exists in the database at all, collect data for all companies in companies_list
-    if df.empty:
+    if not existing_symbols:
         print('Table is empty. Getting data from all companies...')
         df = alpha_collect_companies_data(companies_list, api_key, data_option)[data_option]
+        if not df.empty:
+            save_mode = 'replace'
 
     # if some data exist in the database already, select only the missing ones
     else:
         # select the missing companies' symbols from companies_list.
-        for symbol in companies_list:
-            if symbol not in df.Symbol.tolist():
-                missing_companies_list.append(symbol)
+        missing_companies_list = [symbol for symbol in companies_list if symbol not in existing_symbols]
 
         if not missing_companies_list:
             print('No new company to be added to database. Table is up-to-date!')
@@ -615,9 +838,21 @@ def update_table(companies_list, df, api_key, data_option):
             # update the missing companies' data
             print('Table is out-of-date. Getting data...')
             new_data = alpha_collect_companies_data(missing_companies_list, api_key, data_option)[data_option]
-            df = df.append(new_data, ignore_index=True)
 
-    return df
+            if not new_data.empty:
+                with get_engine(database_filepath).connect() as connection:
+                    table_columns = [column['name'] for column in inspect(connection).get_columns(table_name)]
+
+                    # only the new data is appended to the table if the table has all of its columns already,
+                    # otherwise the existing table is loaded to be saved again with the new columns
+                    if set(new_data.columns).issubset(table_columns):
+                        df = new_data
+                        save_mode = 'append'
+                    else:
+                        df = pd.concat([load_table(connection, table_name), new_data], ignore_index=True)
+                        save_mode = 'replace'
+
+    return df, save_mode
 
 
 def update_database(companies_list, database_filepath, api_key, data_options):
@@ -641,46 +876,53 @@ def update_database(companies_list, database_filepath, api_key, data_options):
     """
 
     valid_data_options = [0, 1, 2, 3]
+    save_modes = {}
 
     if set(data_options).issubset(set(valid_data_options)):
-        # load companies' financial statements, profile, stock prices and earnings dataframes from the given database
-        print('-> Loading database...')
-        df_financial_statements, df_profile, df_stock_prices, df_earnings = load_existing_data(database_filepath)
+        # the tables are only loaded from the given database by update_table if they have to be replaced
+        df_financial_statements, df_profile, df_stock_prices, df_earnings = (pd.DataFrame(), pd.DataFrame(),
+                                                                             pd.DataFrame(), pd.DataFrame())
 
         # Update the selected tables in database
         if 0 in data_options:
             print('--> Updating CompanyProfileTable...')
-            df_profile = update_table(companies_list, df_profile, api_key, 0)
+            df_profile, save_modes[0] = update_table(companies_list, database_filepath, api_key, 0)
 
         if 1 in data_options:
             print('--> Updating FinancialStatementsTable...')
-            df_financial_statements = update_table(companies_list, df_financial_statements, api_key, 1)
+            df_financial_statements, save_modes[1] = update_table(companies_list, database_filepath, api_key, 1)
 
         if 2 in data_options:
             print('--> Updating StockPricesTable...')
-            df_stock_prices = update_table(companies_list, df_stock_prices, api_key, 2)
+            df_stock_prices, save_modes[2] = update_table(companies_list, database_filepath, api_key, 2)
 
         if 3 in data_options:
             print('--> Updating EarningsTable...')
-            df_earnings = update_table(companies_list, df_earnings, api_key, 3)
+            df_earnings, save_modes[3] = update_table(companies_list, database_filepath, api_key, 3)
+
+        # the data only needs to be cleaned and saved if any of the selected tables has new data
+        if not any(save_modes.values()):
+            print('--> Database is up-to-date!')
+            return
 
-        # preprocess data before saving the final dataframes to the database
+        # preprocess data before saving the final dataframes to the database, only the new rows of the tables
+        # that are appended to need to be cleaned
         print('--> Cleaning Data...')
         clean_data(df_profile, df_financial_statements, df_stock_prices, df_earnings)
 
-        # save the dataframes to the database
+        # save only the updated dataframes to the database, either by replacing or appending to the tables
         print('--> Saving Data...')
-        if (0 in data_options) and (not df_profile.empty):
-            save_data(df_profile, database_filepath, 'CompanyProfileTable')
+        if save_modes.get(0):
+            save_data(df_profile, database_filepath, 'CompanyProfileTable', save_modes[0])
 
-        if 1 in data_options and (not df_financial_statements.empty):
-            save_data(df_financial_statements, database_filepath, 'FinancialStatementsTable')
+        if save_modes.get(1):
+            save_data(df_financial_statements, database_filepath, 'FinancialStatementsTable', save_modes[1])
 
-        if 2 in data_options and (not df_stock_prices.empty):
-            save_data(df_stock_prices, database_filepath, 'StockPricesTable')
+        if save_modes.get(2):
+            save_data(df_stock_prices, database_filepath, 'StockPricesTable', save_modes[2])
 
-        if 3 in data_options and (not df_earnings.empty):
-            save_data(df_earnings, database_filepath, 'EarningsTable')
+        if save_modes.get(3):
+            save_data(df_earnings, database_filepath, 'EarningsTable', save_modes[3])
 
     else:
         print('Err: Invalid data_options in update_database()')